@@ -1,18 +1,24 @@
 import functions_framework
 import os
-from datetime import datetime, timedelta
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from telegram import Bot
-from telegram.error import TelegramError
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-import google.generativeai as genai
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.proxies import WebshareProxyConfig
-from youtube_transcript_api.formatters import TextFormatter
+from diskcache import Cache, Disk
+from diskcache.core import UNKNOWN
+import zstandard
+import httpx
+import orjson
 import asyncio
+import concurrent.futures
+import contextvars
+import functools
 import logging
 import sys
+import textwrap
+import argparse
+import hashlib
+import hmac
+import urllib.parse
+import xml.etree.ElementTree as ET
 
 # Configure logging
 def setup_logging():
@@ -51,65 +57,449 @@ CHANNEL_IDS = os.getenv('YOUTUBE_CHANNEL_IDS', '').split(',')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 WEBSHARE_PROXY_USERNAME = os.getenv('WEBSHARE_PROXY_USERNAME')
 WEBSHARE_PROXY_PASSWORD = os.getenv('WEBSHARE_PROXY_PASSWORD')
+YOUTUBE_API_URL = 'https://www.googleapis.com/youtube/v3/'
+MAX_CONCURRENT_CHANNELS = 8
+# Telegram counts the message length in UTF-16 code units
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+# Errors are shortened, rather than left out of the digest, while at least this room is left
+ERROR_MESSAGE_MIN_LENGTH = 200
+# Longer transcripts are trimmed in the middle before being sent to Gemini (~15K tokens)
+MAX_TRANSCRIPT_CHARS = 60_000
+# Maximum time to wait for a transcription, across all the methods
+TRANSCRIPTION_TIMEOUT = 8.0
+# Head start of youtube-transcript-api before also trying the YouTube Data API captions,
+# which cost 50 quota units per captions.list call
+TRANSCRIPTION_FALLBACK_DELAY = 3.0
+UTC = timezone.utc
+# Only videos published within this window are summarized
+FRESHNESS_WINDOW = timedelta(hours=6)
+# /tmp is the only writable path inside a Cloud Function
+CACHE_DIR = os.getenv('CACHE_DIR', '/tmp/ai_press_review')
+# When set, the state shared by the Cloud Functions (notified videos and push notification
+# subscriptions) is kept in Firestore, in collections with this prefix, instead of in CACHE_DIR
+FIRESTORE_COLLECTION_PREFIX = os.getenv('FIRESTORE_COLLECTION_PREFIX')
+TRANSCRIPT_CACHE_EXPIRE = 7 * 86400
+SUMMARY_CACHE_EXPIRE = 86400
+NOTIFIED_CACHE_EXPIRE = 7 * 86400
+# YouTube push notifications, via WebSub (PubSubHubbub)
+WEBSUB_HUB_URL = 'https://pubsubhubbub.appspot.com/subscribe'
+WEBSUB_TOPIC_URL = 'https://www.youtube.com/xml/feeds/videos.xml?channel_id={channel_id}'
+WEBSUB_CALLBACK_URL = os.getenv('WEBSUB_CALLBACK_URL')
+WEBSUB_SECRET = os.getenv('WEBSUB_SECRET')
+WEBSUB_LEASE_SECONDS = 5 * 86400
+# Subscriptions are renewed when less than this time is left on their lease
+WEBSUB_RENEWAL_MARGIN = 86400
+ATOM_NAMESPACES = {
+    'atom': 'http://www.w3.org/2005/Atom',
+    'yt': 'http://www.youtube.com/xml/schemas/2015'
+}
+
+# Gemini prompt and Telegram message templates
+PROMPT_TEMPLATE = textwrap.dedent("""
+    Please analyze this YouTube video and provide a concise summary.
 
-# Initialize YouTube API client
-youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
+    Here are the details:
+    Video Title: {title}
+    Video Description: {description}
+    Video URL: {url}
 
-# Configure Gemini
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash-lite')
+    Full Transcript:
+    {transcription}
 
-def is_cloud_function():
-    """Check if the code is running in a Google Cloud Function environment."""
-    return os.getenv('FUNCTION_TARGET') is not None
+    Based on the above information, please provide a structured summary that includes:
 
-async def send_error_notification(video_id, video_title, error_message):
-    """Send an error notification to Telegram."""
-    try:
-        bot = Bot(token=TELEGRAM_BOT_TOKEN)
-        
-        message = f"""
+    *DETAILED CONTENT BREAKDOWN*
+    - Break down the video content into logical sections
+    - Explain the flow of the discussion
+    - Note any important examples or demonstrations
+
+    *TECHNICAL DETAILS* (if applicable)
+    - Note any specific tools, technologies, or methods mentioned
+    - Explain any technical concepts or processes
+    - List any code snippets or commands if relevant
+
+    Please format your response using Telegram markdown:
+    - Use *asterisks* for bold text
+    - Use _underscores_ for italic text
+    - Use `backticks` for code snippets
+    - Use - for bullet points
+    - Keep the summary concise and focused on the most important points
+    - Aim for a length that can be read in less than one minute
+    """)
+
+ERROR_MSG_TEMPLATE = """
 ⚠️ Video processing error alert! ⚠️
+{errors}
+The videos above won't be summarized because of the errors.
+"""
 
+ERROR_ENTRY_TEMPLATE = """
 📺 Video: {video_title}
 🔗 URL: https://www.youtube.com/watch?v={video_id}
 ❌ Error: {error_message}
+"""
 
-The video won't be summarized because of the error.
-        """
-        
+ERROR_OVERFLOW_TEMPLATE = """
+...and {count} more errors
+"""
+
+VIDEO_MSG_TEMPLATE = """
+🎥 *New Video Alert!* 🎥
+
+📺 Channel: {channel_name}
+📺 Title: {title}
+📝 Summary:
+{summary}
+🔗 Watch here: https://www.youtube.com/watch?v={video_id}
+"""
+
+# The SDKs below are heavy to import, so their clients are created on first use to keep
+# the Cloud Function cold start fast when there is no new video to process
+
+def _build_thread_safe_request(http, *args, **kwargs):
+    """Build a googleapiclient request with its own connection, as httplib2 is not thread-safe."""
+    from googleapiclient.http import HttpRequest, build_http
+    # build_http keeps the client default socket timeout, unlike a bare httplib2.Http
+    return HttpRequest(build_http(), *args, **kwargs)
+
+@functools.lru_cache(maxsize=1)
+def get_youtube():
+    """Return the googleapiclient YouTube client, used only for the captions endpoints."""
+    from googleapiclient.discovery import build
+    return build('youtube', 'v3', developerKey=YOUTUBE_API_KEY, requestBuilder=_build_thread_safe_request)
+
+def create_youtube_client():
+    """Create an async HTTP client for the YouTube Data API REST endpoints.
+
+    It's bound to the event loop of the current run, so a new one is created for every run.
+    """
+    return httpx.AsyncClient(
+        base_url=YOUTUBE_API_URL,
+        params={'key': YOUTUBE_API_KEY},
+        http2=True,
+        timeout=30.0
+    )
+
+async def youtube_api_get(client, resource, **params):
+    """Call a YouTube Data API list endpoint and return the decoded response."""
+    response = await client.get(resource, params=params)
+    response.raise_for_status()
+    return orjson.loads(response.content)
+
+@functools.lru_cache(maxsize=1)
+def get_firestore():
+    """Return the Firestore client."""
+    from google.cloud import firestore
+    return firestore.Client()
+
+@functools.lru_cache(maxsize=1)
+def get_gemini_model():
+    """Return the Gemini model."""
+    import google.generativeai as genai
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai.GenerativeModel('gemini-2.0-flash-lite')
+
+@functools.lru_cache(maxsize=1)
+def get_bot():
+    """Return the Telegram bot, sharing one connection pool across all the messages."""
+    from telegram import Bot
+    from telegram.request import HTTPXRequest
+    return Bot(
+        token=TELEGRAM_BOT_TOKEN,
+        # HTTP/2 multiplexes concurrent messages over a single connection
+        request=HTTPXRequest(http_version="2", connection_pool_size=16, pool_timeout=10.0)
+    )
+
+@functools.lru_cache(maxsize=1)
+def get_ytt_api():
+    """Return the youtube-transcript-api client, reusing its HTTP session across transcriptions."""
+    from youtube_transcript_api import YouTubeTranscriptApi
+    from youtube_transcript_api.proxies import WebshareProxyConfig
+
+    if is_cloud_function():
+        # all requests done by ytt_api will now be proxied through Webshare
+        # https://github.com/jdepoix/youtube-transcript-api?tab=readme-ov-file#working-around-ip-bans-requestblocked-or-ipblocked-exception
+        return YouTubeTranscriptApi(
+            proxy_config=WebshareProxyConfig(
+                proxy_username=WEBSHARE_PROXY_USERNAME,
+                proxy_password=WEBSHARE_PROXY_PASSWORD,
+            )
+        )
+    # When running locally, we don't need to proxy through Webshare because
+    # YouTube doesn't block "consumer" IP addresses.
+    return YouTubeTranscriptApi()
+
+@functools.lru_cache(maxsize=1)
+def get_transcript_formatter():
+    """Return the formatter used to turn a transcript into plain text."""
+    from youtube_transcript_api.formatters import TextFormatter
+    return TextFormatter()
+
+# Lock created at the start of every run, so concurrent tasks sending messages initialize
+# the Telegram bot, and call getMe, only once
+bot_init_lock = contextvars.ContextVar('bot_init_lock')
+
+async def get_initialized_bot():
+    """Return the Telegram bot, initializing it on first use in the current run."""
+    bot = get_bot()
+    async with bot_init_lock.get():
+        await bot.initialize()
+    return bot
+
+async def shutdown_bot():
+    """Shut down the Telegram bot, if it was used in the current run."""
+    if get_bot.cache_info().currsize:
+        await get_bot().shutdown()
+
+class ZstdDisk(Disk):
+    """diskcache storage that compresses text values with zstd."""
+
+    def __init__(self, directory, compress_level=3, **kwargs):
+        self._compressor = zstandard.ZstdCompressor(level=compress_level)
+        self._decompressor = zstandard.ZstdDecompressor()
+        super().__init__(directory, **kwargs)
+
+    def store(self, value, read, key=UNKNOWN):
+        if not read and isinstance(value, str):
+            value = self._compressor.compress(value.encode('utf-8'))
+        return super().store(value, read, key=key)
+
+    def fetch(self, mode, filename, value, read):
+        data = super().fetch(mode, filename, value, read)
+        if not read and isinstance(data, bytes):
+            data = self._decompressor.decompress(data).decode('utf-8')
+        return data
+
+# Initialize disk caches. Transcripts never change for a given video, while summaries are
+# kept long enough to avoid calling Gemini again when a run is retried
+transcript_cache = Cache(os.path.join(CACHE_DIR, 'transcripts'), disk=ZstdDisk, disk_compress_level=3)
+summary_cache = Cache(os.path.join(CACHE_DIR, 'summaries'))
+class FirestoreCache:
+    """Minimal get/set cache on a Firestore collection, shared across Cloud Function instances.
+
+    It mirrors the subset of the diskcache.Cache interface in use. Expired documents are
+    ignored on read, and can be removed with a Firestore TTL policy on the expire_at field.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def get(self, key):
+        snapshot = get_firestore().collection(self._collection).document(key).get()
+        if not snapshot.exists:
+            return None
+        document = snapshot.to_dict()
+        if document['expire_at'] <= datetime.now(UTC):
+            return None
+        return document['value']
+
+    def set(self, key, value, expire):
+        get_firestore().collection(self._collection).document(key).set({
+            'value': value,
+            'expire_at': datetime.now(UTC) + timedelta(seconds=expire)
+        })
+
+def _shared_cache(name):
+    """Return the cache for state shared by the Cloud Functions, in Firestore when configured."""
+    if FIRESTORE_COLLECTION_PREFIX:
+        return FirestoreCache(f"{FIRESTORE_COLLECTION_PREFIX}_{name}")
+    return Cache(os.path.join(CACHE_DIR, name))
+
+# Already notified videos, to avoid processing the same video twice, even when an older
+# video is pushed again because it was edited, or a pushed video is found again by the poll
+notified_cache = _shared_cache('notified')
+# Push notification subscriptions still far from their lease expiration, by channel
+subscription_cache = _shared_cache('subscriptions')
+
+def parse_youtube_timestamp(timestamp):
+    """Parse a YouTube API timestamp, like 2024-01-01T12:00:00Z, into an aware UTC datetime."""
+    return datetime.fromisoformat(timestamp.removesuffix('Z')).replace(tzinfo=UTC)
+
+def truncate_transcription(transcription):
+    """Keep the beginning and the end of a transcription longer than MAX_TRANSCRIPT_CHARS."""
+    if len(transcription) <= MAX_TRANSCRIPT_CHARS:
+        return transcription
+    half = MAX_TRANSCRIPT_CHARS // 2
+    return transcription[:half] + "\n...[middle truncated]...\n" + transcription[-half:]
+
+def is_cloud_function():
+    """Check if the code is running in a Google Cloud Function environment."""
+    return os.getenv('FUNCTION_TARGET') is not None
+
+def telegram_length(text):
+    """Return the length of a text as counted by Telegram, in UTF-16 code units."""
+    return len(text.encode('utf-16-le')) // 2
+
+def truncate_to_telegram_length(text, limit):
+    """Shorten a text to at most limit UTF-16 code units, ending it with an ellipsis."""
+    if telegram_length(text) <= limit:
+        return text
+    if limit <= 0:
+        return ""
+    # Cutting the UTF-16 encoding may split a surrogate pair, which is then dropped
+    return text.encode('utf-16-le')[:(limit - 1) * 2].decode('utf-16-le', errors='ignore') + "…"
+
+def format_error_message(errors):
+    """Format the errors into a single message, within the Telegram message length limit.
+
+    Whole entries are added while they fit, and the remaining ones are only counted.
+    """
+    # Leave room for the header, the footer and the overflow line
+    budget = (
+        TELEGRAM_MAX_MESSAGE_LENGTH
+        - telegram_length(ERROR_MSG_TEMPLATE.format(errors=""))
+        - telegram_length(ERROR_OVERFLOW_TEMPLATE.format(count=len(errors)))
+    )
+    entries = []
+    for video_id, video_title, error_message in errors:
+        entry = ERROR_ENTRY_TEMPLATE.format(
+            video_title=video_title,
+            video_id=video_id,
+            error_message=error_message
+        )
+        if telegram_length(entry) > budget:
+            # Shorten the error of the entry that doesn't fit, unless there is too little room
+            # left for it to be useful. The first entry is always kept
+            available = budget - telegram_length(entry) + telegram_length(error_message)
+            if entries and available < ERROR_MESSAGE_MIN_LENGTH:
+                break
+            entries.append(ERROR_ENTRY_TEMPLATE.format(
+                video_title=video_title,
+                video_id=video_id,
+                error_message=truncate_to_telegram_length(error_message, available)
+            ))
+            break
+        budget -= telegram_length(entry)
+        entries.append(entry)
+
+    if len(entries) < len(errors):
+        entries.append(ERROR_OVERFLOW_TEMPLATE.format(count=len(errors) - len(entries)))
+    return ERROR_MSG_TEMPLATE.format(errors="".join(entries))
+
+async def send_error_notification(errors):
+    """Send a single Telegram notification with all the errors collected during a run.
+
+    Each error is a (video_id, video_title, error_message) tuple.
+    """
+    if not errors:
+        return
+    from telegram.error import TelegramError
+    try:
+        message = format_error_message(errors)
+        bot = await get_initialized_bot()
         await bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
     except TelegramError as e:
-        logger.error(error_message)
+        logger.error(f"Error sending Telegram error notification: {str(e)}")
+
+async def _get_latest_upload(client, channel_id, uploads_playlist_id, channel_name):
+    """Fetch the latest video of a channel from its uploads playlist."""
+    # playlistItems.list costs 1 quota unit, while search.list costs 100
+    response = await youtube_api_get(
+        client,
+        'playlistItems',
+        part="snippet,contentDetails",
+        playlistId=uploads_playlist_id,
+        maxResults=1,
+        # Ask only for the fields in use, to shrink the response
+        fields="items(snippet(title,description,publishedAt),contentDetails(videoId,videoPublishedAt))"
+    )
+
+    if not response.get('items'):
+        return None
+
+    video = response['items'][0]
+    return {
+        'video_id': video['contentDetails']['videoId'],
+        'title': video['snippet']['title'],
+        'published_at': video['contentDetails'].get('videoPublishedAt', video['snippet']['publishedAt']),
+        'description': video['snippet']['description'],
+        'channel_id': channel_id,
+        'channel_name': channel_name
+    }
+
+async def get_latest_videos_bulk(client, channel_ids, errors):
+    """Fetch the latest video of each of the specified YouTube channels.
+
+    Returns a dict keyed by channel ID, with None for channels without videos.
+    Errors are appended to the errors list.
+    """
+    # Resolve the uploads playlist and the name of every channel, 50 channels per request
+    channels = {}
+    for start in range(0, len(channel_ids), 50):
+        chunk = channel_ids[start:start + 50]
+        try:
+            response = await youtube_api_get(
+                client,
+                'channels',
+                part="snippet,contentDetails",
+                id=",".join(chunk),
+                maxResults=50,
+                fields="items(id,snippet/title,contentDetails/relatedPlaylists/uploads)"
+            )
+        except Exception as e:
+            error_message = f"Error getting details of channels {', '.join(chunk)}: {str(e)}"
+            logger.error(error_message)
+            errors.append(("N/A", f"Channels {', '.join(chunk)}", error_message))
+            continue
+
+        for item in response.get('items', []):
+            channels[item['id']] = (
+                item['contentDetails']['relatedPlaylists']['uploads'],
+                item['snippet']['title']
+            )
 
-async def get_latest_video(channel_id):
-    """Fetch the latest video from the specified YouTube channel."""
+    for channel_id in channel_ids:
+        if channel_id not in channels:
+            logger.warning(f"Channel {channel_id} not found")
+
+    # Then fetch the latest upload of each channel in parallel
+    found_channel_ids = [channel_id for channel_id in channel_ids if channel_id in channels]
+    results = await asyncio.gather(
+        *[_get_latest_upload(client, channel_id, *channels[channel_id])
+          for channel_id in found_channel_ids],
+        return_exceptions=True
+    )
+
+    latest_videos = {channel_id: None for channel_id in channel_ids}
+    for channel_id, result in zip(found_channel_ids, results):
+        if isinstance(result, Exception):
+            error_message = f"Error getting latest video from channel {channel_id}: {str(result)}"
+            logger.error(error_message)
+            errors.append(("N/A", f"Channel {channel_id}", error_message))
+            continue
+        if not result:
+            logger.info(f"No videos found for channel {channel_id}")
+        latest_videos[channel_id] = result
+    return latest_videos
+
+async def get_video_details(client, video_id, errors):
+    """Fetch the details of the specified YouTube video."""
     try:
-        request = youtube.search().list(
+        response = await youtube_api_get(
+            client,
+            'videos',
             part="snippet",
-            channelId=channel_id,
-            maxResults=1,
-            order="date",
-            type="video"
+            id=video_id,
+            fields="items(snippet(title,description,publishedAt,channelId,channelTitle))"
         )
-        response = request.execute()
-        
-        if not response['items']:
-            logger.info(f"No videos found for channel {channel_id}")
+
+        if not response.get('items'):
+            logger.info(f"Video {video_id} not found")
             return None
-        
+
         video = response['items'][0]
         return {
-            'video_id': video['id']['videoId'],
+            'video_id': video_id,
             'title': video['snippet']['title'],
             'published_at': video['snippet']['publishedAt'],
             'description': video['snippet']['description'],
-            'channel_id': channel_id
+            'channel_id': video['snippet']['channelId'],
+            'channel_name': video['snippet']['channelTitle']
         }
     except Exception as e:
-        error_message = f"Error getting latest video from channel {channel_id}: {str(e)}"
+        error_message = f"Error getting details of video {video_id}: {str(e)}"
         logger.error(error_message)
-        await send_error_notification("N/A", f"Channel {channel_id}", error_message)
+        errors.append((video_id, f"Video {video_id}", error_message))
         return None
 
 def get_video_transcription_via_yt_transcription_lib(video_id, video_title):
@@ -121,27 +511,13 @@ def get_video_transcription_via_yt_transcription_lib(video_id, video_title):
       and it does not require a headless browser, like other selenium based solutions do!
     """
     try:
-
-        if is_cloud_function():
-            # all requests done by ytt_api will now be proxied through Webshare
-            # https://github.com/jdepoix/youtube-transcript-api?tab=readme-ov-file#working-around-ip-bans-requestblocked-or-ipblocked-exception
-            ytt_api = YouTubeTranscriptApi(
-                proxy_config=WebshareProxyConfig(
-                    proxy_username=WEBSHARE_PROXY_USERNAME,
-                    proxy_password=WEBSHARE_PROXY_PASSWORD,
-                )
-            )
-        else:
-            # When running locally, we don't need to proxy through Webshare because
-            # YouTube doesn't block "consumer" IP addresses.
-            ytt_api = YouTubeTranscriptApi()
+        ytt_api = get_ytt_api()
 
         # Get the transcript
         transcript_list = ytt_api.fetch(video_id)
         
         # Format the transcript into a single string
-        formatter = TextFormatter()
-        transcript_text = formatter.format_transcript(transcript_list)
+        transcript_text = get_transcript_formatter().format_transcript(transcript_list)
         
         return transcript_text, None
         
@@ -157,7 +533,7 @@ def get_video_transcription_via_yt_api(video_id, video_title):
     """
     try:
         # Get the captions list
-        captions_request = youtube.captions().list(
+        captions_request = get_youtube().captions().list(
             part="snippet",
             videoId=video_id
         )
@@ -171,19 +547,15 @@ def get_video_transcription_via_yt_api(video_id, video_title):
         caption_id = captions_response['items'][0]['id']
         
         # Download the caption track
-        caption_request = youtube.captions().download(
+        caption_request = get_youtube().captions().download(
             id=caption_id
         )
         caption_response = caption_request.execute()
         
-        # The response is in TTML format, we need to parse it
-        # This is a simplified parsing, you might need to adjust based on the actual format
-        transcript_text = ""
-        for line in caption_response.split('\n'):
-            if '<text' in line:
-                # Extract the text content
-                text = line.split('>')[1].split('<')[0]
-                transcript_text += text + " "
+        # The response is an XML caption track, with the text split across <text> elements
+        root = ET.fromstring(caption_response)
+        parts = ["".join(element.itertext()) for element in root.findall('.//{*}text')]
+        transcript_text = " ".join(part for part in parts if part)
         
         return transcript_text.strip(), None
         
@@ -192,129 +564,340 @@ def get_video_transcription_via_yt_api(video_id, video_title):
         logger.error(error_message)
         return None, error_message
 
-async def create_video_summary(video):
+async def get_video_transcription(video_id, video_title):
+    """Extract the video transcription, racing all the available methods.
+
+    youtube-transcript-api starts first, and the YouTube Data API fallback joins the race
+    once it failed or its head start ran out. The first method returning a transcription
+    wins. The methods run in a dedicated thread
+    pool, so waiting for a free worker doesn't eat into the timeout. The blocking calls
+    can't be interrupted: a method still running when the race ends keeps its thread
+    until it returns, without delaying the run, though the interpreter waits for it at exit.
+    """
+    transcript_text = transcript_cache.get(video_id)
+    if transcript_text is not None:
+        logger.info(f"Using cached transcription for video {video_id}")
+        return transcript_text, None
+
+    methods = [get_video_transcription_via_yt_transcription_lib, get_video_transcription_via_yt_api]
+    loop = asyncio.get_running_loop()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(methods), thread_name_prefix='transcription')
+    pending = {loop.run_in_executor(executor, methods.pop(0), video_id, video_title)}
+    error_messages = []
+    deadline = loop.time() + TRANSCRIPTION_TIMEOUT
+    fallback_at = loop.time() + TRANSCRIPTION_FALLBACK_DELAY
+    try:
+        while pending:
+            wait_until = min(deadline, fallback_at) if methods else deadline
+            timeout = wait_until - loop.time()
+            if timeout > 0:
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    transcript_text, error_message = future.result()
+                    if transcript_text:
+                        # Only successful transcriptions are cached, so failures are retried on the next run
+                        transcript_cache.set(video_id, transcript_text, expire=TRANSCRIPT_CACHE_EXPIRE, tag='transcript')
+                        return transcript_text, None
+                    error_messages.append(error_message)
+            if loop.time() >= deadline:
+                break
+            # Start the fallback once the running methods failed or their head start is over
+            if methods and (not pending or loop.time() >= fallback_at):
+                pending.add(loop.run_in_executor(executor, methods.pop(0), video_id, video_title))
+    finally:
+        for future in pending:
+            future.cancel()
+        # Don't wait for the abandoned methods
+        executor.shutdown(wait=False)
+
+    if pending:
+        error_message = f"Timed out getting video transcription after {TRANSCRIPTION_TIMEOUT:g} seconds"
+        logger.error(error_message)
+        error_messages.append(error_message)
+    return None, "; ".join(message for message in error_messages if message) or None
+
+async def create_video_summary(video, errors):
     """Create a detailed summary of the video using Gemini API."""
     video_url = f"https://www.youtube.com/watch?v={video['video_id']}"
+
+    summary = summary_cache.get(video['video_id'])
+    if summary is not None:
+        logger.info(f"Using cached summary for video {video['video_id']}")
+        return summary
     
     # Get video transcription based on environment
-    transcription, error_message = get_video_transcription_via_yt_transcription_lib(video['video_id'], video['title'])
+    transcription, error_message = await get_video_transcription(video['video_id'], video['title'])
     
     if not transcription:
         # Send error notification
         # logger.warning(f"No transcription available for video {video['title']}")
-        await send_error_notification(video['video_id'], video['title'], error_message if error_message is not None else "No transcription available")
+        errors.append((video['video_id'], video['title'], error_message if error_message is not None else "No transcription available"))
         return None
     
-    prompt = f"""
-    Please analyze this YouTube video and provide a concise summary.
-    
-    Here are the details:
-    Video Title: {video['title']}
-    Video Description: {video['description']}
-    Video URL: {video_url}
-
-    Full Transcript:
-    {transcription}
-
-    Based on the above information, please provide a structured summary that includes:
-
-    *DETAILED CONTENT BREAKDOWN*
-    - Break down the video content into logical sections
-    - Explain the flow of the discussion
-    - Note any important examples or demonstrations
-
-    *TECHNICAL DETAILS* (if applicable)
-    - Note any specific tools, technologies, or methods mentioned
-    - Explain any technical concepts or processes
-    - List any code snippets or commands if relevant
-
-    Please format your response using Telegram markdown:
-    - Use *asterisks* for bold text
-    - Use _underscores_ for italic text
-    - Use `backticks` for code snippets
-    - Use - for bullet points
-    - Keep the summary concise and focused on the most important points
-    - Aim for a length that can be read in less than one minute
-    """
+    prompt = PROMPT_TEMPLATE.format(
+        title=video['title'],
+        description=video['description'],
+        url=video_url,
+        transcription=truncate_transcription(transcription)
+    )
     
     try:
-        response = model.generate_content(prompt)
+        # Run the blocking call in a thread, so summaries of different channels are generated concurrently
+        response = await asyncio.to_thread(get_gemini_model().generate_content, prompt)
+        summary_cache.set(video['video_id'], response.text, expire=SUMMARY_CACHE_EXPIRE, tag='summary')
         return response.text
     except Exception as e:
         error_message = f"Error generating summary with Gemini: {str(e)}"
         logger.error(error_message)
-        await send_error_notification(video['video_id'], video['title'], error_message)
+        errors.append((video['video_id'], video['title'], error_message))
         return None
 
 async def send_telegram_message(video, summary):
-    """Send a message to the specified Telegram chat."""
+    """Send a message to the specified Telegram chat.
+
+    Returns True if the message was sent.
+    """
+    from telegram.error import TelegramError
     try:
-        bot = Bot(token=TELEGRAM_BOT_TOKEN)
-        
-        # Get channel information
-        channel_request = youtube.channels().list(
-            part="snippet",
-            id=video['channel_id']
+        message = VIDEO_MSG_TEMPLATE.format(
+            channel_name=video['channel_name'],
+            title=video['title'],
+            summary=summary,
+            video_id=video['video_id']
         )
-        channel_response = channel_request.execute()
-        channel_name = channel_response['items'][0]['snippet']['title'] if channel_response['items'] else "Unknown Channel"
-        
-        message = f"""
-🎥 *New Video Alert!* 🎥
-
-📺 Channel: {channel_name}
-📺 Title: {video['title']}
-📝 Summary:
-{summary}
-🔗 Watch here: https://www.youtube.com/watch?v={video['video_id']}
-        """
-        
+        bot = await get_initialized_bot()
         await bot.send_message(
             chat_id=TELEGRAM_CHAT_ID,
             text=message,
             disable_web_page_preview=False
         )
+        return True
     except TelegramError as e:
         logger.error(f"Error sending Telegram message: {str(e)}")
+        return False
 
-async def check_and_notify():
-    """Main function to check for new videos and send notifications."""
-    for channel_id in CHANNEL_IDS:
-        if not channel_id.strip():
-            continue
-            
-        # Get the latest video
-        latest_video = await get_latest_video(channel_id.strip())
+async def _process_channel(channel_id, latest_video, semaphore, now, errors):
+    """Check the latest video of a single channel and send the notification."""
+    async with semaphore:
         if not latest_video:
             logger.warning(f"No videos found for channel {channel_id}")
-            continue
-        
-        # Check if the video was published in the last 6 hours
-        video_published_at = datetime.fromisoformat(latest_video['published_at'].replace('Z', '+00:00'))
-        if datetime.now(video_published_at.tzinfo) - video_published_at > timedelta(hours=6):
-            logger.info(f"No new videos in the last 6 hours for channel {channel_id}")
-            continue
-        
+            return
+
+        if await asyncio.to_thread(notified_cache.get, latest_video['video_id']):
+            logger.info(f"Video {latest_video['video_id']} from channel {channel_id} was already notified")
+            return
+
+        # Check if the video was published within the freshness window
+        if now - parse_youtube_timestamp(latest_video['published_at']) > FRESHNESS_WINDOW:
+            logger.info(f"No new videos in the last {FRESHNESS_WINDOW.total_seconds() / 3600:g} hours for channel {channel_id}")
+            return
+
         # Create summary and send notification
-        summary = await create_video_summary(latest_video)
+        summary = await create_video_summary(latest_video, errors)
         if summary:  # Only send notification if summary was generated
-            await send_telegram_message(latest_video, summary)
-            logger.info(f"Successfully processed and notified about a new video from channel {channel_id}")
+            if await send_telegram_message(latest_video, summary):
+                await asyncio.to_thread(notified_cache.set, latest_video['video_id'], True, expire=NOTIFIED_CACHE_EXPIRE)
+                logger.info(f"Successfully processed and notified about a new video from channel {channel_id}")
         else:
             logger.warning(f"Failed to process video from channel {channel_id}")
 
+async def check_and_notify():
+    """Main function to check for new videos and send notifications."""
+    # Channels are processed concurrently, capped to avoid hammering the external APIs
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHANNELS)
+    channel_ids = [channel_id.strip() for channel_id in CHANNEL_IDS if channel_id.strip()]
+    now = datetime.now(UTC)
+    # Errors are collected during the run and notified all together at the end
+    errors = []
+    bot_init_lock.set(asyncio.Lock())
+    try:
+        async with create_youtube_client() as client:
+            latest_videos = await get_latest_videos_bulk(client, channel_ids, errors)
+        results = await asyncio.gather(
+            *[_process_channel(channel_id, latest_videos[channel_id], semaphore, now, errors) for channel_id in channel_ids],
+            return_exceptions=True
+        )
+        for channel_id, result in zip(channel_ids, results):
+            if isinstance(result, Exception):
+                error_message = f"Unexpected error processing channel {channel_id}: {str(result)}"
+                logger.error(error_message)
+                errors.append(("N/A", f"Channel {channel_id}", error_message))
+    finally:
+        await send_error_notification(errors)
+        await shutdown_bot()
+
+async def notify_pushed_videos(pushed_videos):
+    """Process the videos received via push notification and send the notifications."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHANNELS)
+    now = datetime.now(UTC)
+    errors = []
+    bot_init_lock.set(asyncio.Lock())
+    try:
+        async with create_youtube_client() as client:
+            videos = await asyncio.gather(
+                *[get_video_details(client, video_id, errors) for video_id, _ in pushed_videos]
+            )
+
+        to_process = []
+        for (video_id, channel_id), video in zip(pushed_videos, videos):
+            if not video:
+                continue
+            # The payload can't be trusted, so the video must really come from the pushed channel
+            if video['channel_id'] != channel_id:
+                logger.warning(f"Discarding pushed video {video_id}, not published by channel {channel_id}")
+                continue
+            to_process.append((channel_id, video))
+
+        results = await asyncio.gather(
+            *[_process_channel(channel_id, video, semaphore, now, errors) for channel_id, video in to_process],
+            return_exceptions=True
+        )
+        for (channel_id, video), result in zip(to_process, results):
+            if isinstance(result, Exception):
+                error_message = f"Unexpected error processing pushed video {video['video_id']}: {str(result)}"
+                logger.error(error_message)
+                errors.append((video['video_id'], video['title'], error_message))
+    finally:
+        await send_error_notification(errors)
+        await shutdown_bot()
+
+def parse_push_notification(body):
+    """Extract (video_id, channel_id) pairs from a YouTube WebSub Atom feed."""
+    root = ET.fromstring(body)
+    pushed_videos = []
+    for entry in root.findall('atom:entry', ATOM_NAMESPACES):
+        video_id = entry.findtext('yt:videoId', namespaces=ATOM_NAMESPACES)
+        channel_id = entry.findtext('yt:channelId', namespaces=ATOM_NAMESPACES)
+        if video_id and channel_id:
+            pushed_videos.append((video_id, channel_id))
+    return pushed_videos
+
+def is_valid_push_signature(body, signature):
+    """Check the X-Hub-Signature header of a push notification against WEBSUB_SECRET."""
+    expected = b'sha1=' + hmac.new(WEBSUB_SECRET.encode('utf-8'), body, hashlib.sha1).hexdigest().encode('ascii')
+    # Compare bytes, as compare_digest raises TypeError on non-ASCII strings
+    return hmac.compare_digest(expected, (signature or '').encode('utf-8', 'surrogateescape'))
+
+async def _subscribe_channel(client, callback_url, channel_id):
+    """Subscribe the callback URL to the upload feed of a channel."""
+    data = {
+        'hub.callback': callback_url,
+        'hub.topic': WEBSUB_TOPIC_URL.format(channel_id=channel_id),
+        'hub.mode': 'subscribe',
+        'hub.verify': 'async',
+        'hub.lease_seconds': WEBSUB_LEASE_SECONDS,
+        'hub.secret': WEBSUB_SECRET
+    }
+    try:
+        response = await client.post(WEBSUB_HUB_URL, data=data)
+        response.raise_for_status()
+        await asyncio.to_thread(
+            subscription_cache.set, channel_id, callback_url, expire=WEBSUB_LEASE_SECONDS - WEBSUB_RENEWAL_MARGIN
+        )
+        logger.info(f"Subscribed to push notifications for channel {channel_id} (HTTP {response.status_code})")
+    except Exception as e:
+        logger.error(f"Error subscribing to push notifications for channel {channel_id}: {str(e)}")
+
+async def subscribe_to_push_notifications(callback_url, force=False):
+    """Subscribe the callback URL to the upload feed of every monitored channel.
+
+    Subscriptions expire after a few days, so unless force is set only the ones close to
+    their lease expiration are renewed.
+    """
+    if not WEBSUB_SECRET:
+        logger.error("WEBSUB_SECRET is not set, push notifications can't be authenticated and are disabled")
+        return
+    if not FIRESTORE_COLLECTION_PREFIX:
+        logger.error("FIRESTORE_COLLECTION_PREFIX is not set, push notifications need state shared with the scheduled run and are disabled")
+        return
+
+    channel_ids = [channel_id.strip() for channel_id in CHANNEL_IDS if channel_id.strip()]
+    if not force:
+        subscribed_urls = await asyncio.gather(
+            *[asyncio.to_thread(subscription_cache.get, channel_id) for channel_id in channel_ids]
+        )
+        channel_ids = [
+            channel_id for channel_id, subscribed_url in zip(channel_ids, subscribed_urls)
+            if subscribed_url != callback_url
+        ]
+    if not channel_ids:
+        return
+
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        await asyncio.gather(*[_subscribe_channel(client, callback_url, channel_id) for channel_id in channel_ids])
+
 @functions_framework.http
 def perform_press_review(request):
     """Cloud Function entry point."""
     # Run the async function
     asyncio.run(check_and_notify())
+    # The scheduled run is also a good time to renew the expiring push notification subscriptions
+    if WEBSUB_CALLBACK_URL:
+        asyncio.run(subscribe_to_push_notifications(WEBSUB_CALLBACK_URL))
     return "AI Press Review Agent completed successfully"
 
+@functions_framework.http
+def youtube_webhook(request):
+    """Cloud Function entry point for YouTube push notifications."""
+    channel_ids = {channel_id.strip() for channel_id in CHANNEL_IDS if channel_id.strip()}
+
+    # The hub verifies the subscription with a GET request, echoing back the challenge.
+    # Only subscriptions are confirmed, so nobody can unsubscribe the monitored channels
+    if request.method == 'GET':
+        if request.args.get('hub.mode') != 'subscribe':
+            return "Unsupported mode", 404
+        topic = request.args.get('hub.topic', '')
+        topic_channel_id = urllib.parse.parse_qs(urllib.parse.urlparse(topic).query).get('channel_id', [''])[0]
+        if topic_channel_id not in channel_ids:
+            return "Unknown topic", 404
+        return request.args.get('hub.challenge', ''), 200
+
+    # Without a secret anyone could push videos to summarize, so notifications are rejected
+    if not WEBSUB_SECRET:
+        logger.error("WEBSUB_SECRET is not set, rejecting push notification")
+        return "Push notifications are disabled", 403
+    # Without a shared state, the scheduled run would notify the pushed videos again
+    if not FIRESTORE_COLLECTION_PREFIX:
+        logger.error("FIRESTORE_COLLECTION_PREFIX is not set, rejecting push notification")
+        return "Push notifications are disabled", 403
+
+    body = request.get_data()
+    if not is_valid_push_signature(body, request.headers.get('X-Hub-Signature')):
+        # The hub expects a 2xx answer even when the message is discarded
+        logger.warning("Discarding push notification with an invalid signature")
+        return "", 204
+
+    try:
+        pushed_videos = parse_push_notification(body)
+    except ET.ParseError as e:
+        logger.error(f"Error parsing push notification: {str(e)}")
+        return "", 204
+
+    pushed_videos = [(video_id, channel_id) for video_id, channel_id in pushed_videos if channel_id in channel_ids]
+    if pushed_videos:
+        asyncio.run(notify_pushed_videos(pushed_videos))
+    return "", 204
+
 def perform_press_review_via_cli():
     """Command line entry point."""
     logger.info("Starting AI Press Review Agent via CLI")
     asyncio.run(check_and_notify())
     logger.info("AI Press Review Agent completed successfully via CLI")
 
+def subscribe_to_push_notifications_via_cli(callback_url):
+    """Command line entry point to subscribe to YouTube push notifications."""
+    logger.info(f"Subscribing {callback_url} to YouTube push notifications")
+    asyncio.run(subscribe_to_push_notifications(callback_url, force=True))
+
 if __name__ == "__main__":
-    perform_press_review_via_cli()
+    parser = argparse.ArgumentParser(description="AI Press Review Agent")
+    parser.add_argument(
+        '--subscribe',
+        metavar='CALLBACK_URL',
+        help="subscribe the youtube_webhook URL to push notifications, instead of checking for new videos"
+    )
+    args = parser.parse_args()
+    if args.subscribe:
+        subscribe_to_push_notifications_via_cli(args.subscribe)
+    else:
+        perform_press_review_via_cli()